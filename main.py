@@ -1,13 +1,16 @@
 import sys
+import argparse
+from collections import OrderedDict
 import sqlite3
 import csv
 import datetime
 import logging
 import requests
+import numpy as np
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget, QComboBox, QTableWidget, QTableWidgetItem,
     QLineEdit, QPushButton, QMessageBox, QHBoxLayout, QInputDialog, QFileDialog, QTabWidget, QMenuBar, QAction,
-    QStatusBar, QDialog, QVBoxLayout, QTextEdit, QStackedWidget, QToolBar, QStyle
+    QStatusBar, QDialog, QVBoxLayout, QTextEdit, QStackedWidget, QToolBar, QStyle, QAbstractItemView
 )
 from PyQt5.QtGui import QFont, QIcon, QColor, QPixmap, QPalette
 from PyQt5.QtCore import Qt, QTimer, QObject, QEvent, QPropertyAnimation, QEasingCurve
@@ -20,6 +23,11 @@ LOG_FILE = "logg.txt"
 CSV_FILE = "rfid_log.csv"
 BACKUP_CSV_FILE = "backup_rfid_log.csv"
 CLEAR_DELAY = 3000  # 3 sekunder
+DEFAULT_SCHOOL_START = "08:15"  # Schemastart för sena ankomster
+REPORT_CHUNK_SIZE = 100000  # Antal skanningar som läses åt gången i rapporter
+SECONDS_PER_DAY = 86400
+REPORT_CACHE_SIZE = 8  # Antal närvarorapporter som sparas i cachen
+NO_CLASS_LABEL = "Ingen klass"  # Visas för elever utan klass i rapporter
 LOGO_URL = "https://github.com/filip243520/CardReader/raw/main/Media-removebg-preview.png"  # Loggans URL
 
 # Konfigurera loggning
@@ -72,10 +80,37 @@ LANGUAGES = {
 
 CURRENT_LANGUAGE = "sv"  # Standard språk
 
+# Tabeller som varje cachad sida läser från
+PAGE_DEPENDENCIES = {
+    "users": {"users"},
+    "scans": {"users", "scans"},
+    "statistics": {"users", "scans"},
+    "report": {"users"},
+}
+
+# Inmatningsfält där text skrivs för hand och inte ska tolkas som kortskanningar
+MANUAL_INPUT_FIELDS = (
+    "card_id_input", "name_input", "class_input",
+    "report_start_input", "report_end_input", "report_school_start_input", "report_grace_input",
+    "report_holidays_input",
+)
+
 def tr(key):
     """Hämta översättning för en given nyckel."""
     return LANGUAGES[CURRENT_LANGUAGE].get(key, key)
 
+# Lyssnare som anropas med tabellnamnet när data i databasen ändras
+DATA_LISTENERS = []
+
+def add_data_listener(callback):
+    """Registrera en funktion som anropas när data i databasen ändras."""
+    DATA_LISTENERS.append(callback)
+
+def notify_data_changed(table):
+    """Meddela alla lyssnare att en tabell har ändrats."""
+    for callback in DATA_LISTENERS:
+        callback(table)
+
 def initialize_database():
     """Initiera databasen och skapa tabeller om de inte finns."""
     try:
@@ -101,6 +136,9 @@ def initialize_database():
             )
         """)
         logging.info("Tabellen 'scans' skapad eller redan existerar.")
+
+        # Index för att snabbt hämta skanningar inom ett datumintervall
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans (timestamp)")
         
         # Lägg till fördefinierade användare om de inte redan finns
         predefined_users = [
@@ -136,12 +174,40 @@ def register_card(card_id, name, school_class):
         cursor.execute("INSERT INTO users (id, name, school_class) VALUES (?, ?, ?)", (card_id, name, school_class))
         conn.commit()
         logging.info(f"Kort registrerat: {card_id}, {name}, {school_class}")
+        notify_data_changed("users")
         export_to_csv(BACKUP_CSV_FILE)  # Skapa en backup av databasen
     except sqlite3.Error as e:
         logging.error(f"Databasfel: {e}")
     finally:
         conn.close()
 
+def register_cards(users):
+    """Registrera flera kort i en transaktion och skapa en enda backup.
+
+    Kort som redan finns hoppas över. Returnerar listan med överhoppade
+    kort-ID:n, eller None om inget kunde registreras.
+    """
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        skipped = []
+        for card_id, name, school_class in users:
+            cursor.execute("INSERT OR IGNORE INTO users (id, name, school_class) VALUES (?, ?, ?)",
+                           (card_id, name, school_class))
+            if cursor.rowcount == 0:
+                skipped.append(card_id)
+        conn.commit()
+        logging.info(f"{len(users) - len(skipped)} av {len(users)} kort registrerade i en transaktion, "
+                     f"redan registrerade: {skipped}")
+        notify_data_changed("users")
+        export_to_csv(BACKUP_CSV_FILE)  # Skapa en backup av databasen
+        return skipped
+    except sqlite3.Error as e:
+        logging.error(f"Databasfel: {e}")
+        return None
+    finally:
+        conn.close()
+
 def get_user_info(card_id):
     """Hämta användarinformation från databasen."""
     try:
@@ -167,6 +233,7 @@ def log_scan(card_id):
         cursor.execute("INSERT INTO scans (card_id, timestamp) VALUES (?, ?)", (card_id, timestamp))
         conn.commit()
         logging.info(f"Skanning loggad i databas: {card_id}, {timestamp}")
+        notify_data_changed("scans")
     except sqlite3.Error as e:
         logging.error(f"Databasfel: {e}")
     finally:
@@ -199,6 +266,7 @@ def delete_user(card_id):
         cursor.execute("DELETE FROM users WHERE id = ?", (card_id,))
         conn.commit()
         logging.info(f"Användare borttagen: {card_id}")
+        notify_data_changed("users")
         export_to_csv(BACKUP_CSV_FILE)  # Skapa en backup av databasen
     except sqlite3.Error as e:
         logging.error(f"Databasfel: {e}")
@@ -214,6 +282,8 @@ def clear_database():
         cursor.execute("DELETE FROM scans")
         conn.commit()
         logging.info("Databas rensad.")
+        notify_data_changed("users")
+        notify_data_changed("scans")
     except sqlite3.Error as e:
         logging.error(f"Databasfel: {e}")
     finally:
@@ -273,14 +343,275 @@ def import_users_from_csv():
                 preview_dialog.setLayout(preview_layout)
 
                 if preview_dialog.exec_() == QDialog.Accepted:
-                    for row in rows:
-                        if len(row) >= 3:
-                            card_id, name, school_class = row[0], row[1], row[2]
-                            register_card(card_id, name, school_class)
-                    logging.info(f"Användare importerade från {file_path}")
+                    users = [(row[0], row[1], row[2]) for row in rows if len(row) >= 3]
+                    skipped = register_cards(users)
+                    if skipped is None:
+                        logging.error(f"Import från {file_path} misslyckades, inga användare importerade")
+                        QMessageBox.warning(None, "Importera användare", "Importen misslyckades, inga användare importerades.")
+                        return
+                    message = f"{len(users) - len(skipped)} användare importerade"
+                    if skipped:
+                        message += f", redan registrerade: {', '.join(skipped)}"
+                    logging.info(f"{message} från {file_path}")
+                    QMessageBox.information(None, "Importera användare", message)
         except IOError as e:
             logging.error(f"Filfel: {e}")
 
+def read_roster(file_path):
+    """Läs en klasslista med kolumnerna Namn och Klass från en CSV-fil.
+
+    Filen läses som UTF-8 och annars som Windows-1252, som Excel använder för
+    svenska tecken. Returnerar None om filen inte kunde läsas.
+    """
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            with open(file_path, "r", newline='', encoding=encoding) as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Hoppa över rubrikraden
+                roster = [(row[0].strip(), row[1].strip()) for row in reader if len(row) >= 2 and row[0].strip()]
+            logging.info(f"Klasslista inläst från {file_path} ({encoding}): {len(roster)} elever")
+            return roster
+        except UnicodeDecodeError:
+            logging.warning(f"Klasslistan {file_path} är inte {encoding}")
+        except (IOError, csv.Error) as e:
+            logging.error(f"Filfel: {e}")
+            return None
+    logging.error(f"Kunde inte avkoda klasslistan {file_path}")
+    return None
+
+# Närvarorapporter
+REPORT_CACHE = OrderedDict()  # LRU, nyckel: (klass, från, till, skolstart, marginal, lovdagar)
+
+def clear_report_cache(table=None):
+    """Töm cachen för närvarorapporter när datan ändras.
+
+    Nya skanningar får alltid dagens datum, så då tas bara rapporter som
+    innehåller i dag bort.
+    """
+    if table == "scans":
+        today = datetime.date.today()
+        for key in [key for key in REPORT_CACHE if key[1] <= today <= key[2]]:
+            del REPORT_CACHE[key]
+    else:
+        REPORT_CACHE.clear()
+
+add_data_listener(clear_report_cache)
+
+def parse_report_date(text):
+    """Tolka ett datum på formen ÅÅÅÅ-MM-DD."""
+    return datetime.datetime.strptime(text.strip(), "%Y-%m-%d").date()
+
+def parse_holidays(text):
+    """Tolka lovdagar som kommaseparerade datum eller intervall ÅÅÅÅ-MM-DD:ÅÅÅÅ-MM-DD."""
+    holidays = set()
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        first, _, last = part.partition(":")
+        first_date = parse_report_date(first)
+        last_date = parse_report_date(last) if last else first_date
+        holidays.update(first_date + datetime.timedelta(days=i) for i in range((last_date - first_date).days + 1))
+    return holidays
+
+def weekday_mask(days):
+    """Markera måndag-fredag för dagar räknade som heltal sedan 1970-01-01."""
+    return (days + 3) % 7 < 5  # 1970-01-01 var en torsdag, måndag-fredag ger 0-4
+
+def week_start_days(days):
+    """Måndagen i veckan för dagar räknade som heltal sedan 1970-01-01."""
+    return days - (days + 3) % 7
+
+def late_limit_seconds(school_start, grace_minutes=0):
+    """Sekunder efter midnatt då en elev räknas som sen, skolstart anges som TT:MM."""
+    hours, minutes = (int(part) for part in school_start.split(":"))
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Ogiltig tid: {school_start}")
+    return hours * 3600 + minutes * 60 + grace_minutes * 60
+
+def format_time_of_day(seconds):
+    """Formatera sekunder efter midnatt som TT:MM."""
+    return "{:02d}:{:02d}".format(*divmod(int(seconds) // 60, 60))
+
+def build_attendance_report(school_class, start_date, end_date, school_start=DEFAULT_SCHOOL_START, grace_minutes=0,
+                            holidays=()):
+    """Beräkna närvaro per klass och dag samt frånvarande och sena elever.
+
+    Skanningarna läses i delar som kolumner i NumPy-arrayer och räknas ut utan
+    Python-loopar per skanning. Resultatet cachas per klass och datumintervall.
+    Skoldagar är vardagar till och med i dag som inte är lovdagar och där någon
+    på skolan har skannat. Returnerar None om rapporten inte kunde skapas.
+    """
+    holidays = tuple(sorted(holidays))
+    key = (school_class, start_date, end_date, school_start, grace_minutes, holidays)
+    if key in REPORT_CACHE:
+        REPORT_CACHE.move_to_end(key)
+        return REPORT_CACHE[key]
+
+    if end_date < start_date:
+        logging.error(f"Ogiltigt datumintervall för rapport: {start_date} - {end_date}")
+        return None
+    try:
+        late_limit = late_limit_seconds(school_start, grace_minutes)
+    except ValueError:
+        logging.error(f"Ogiltig skolstart för rapport: {school_start}")
+        return None
+
+    # Dagar räknas som heltal sedan 1970-01-01
+    dates = np.arange(np.datetime64(start_date), np.datetime64(end_date) + 1)
+    days = dates.astype(np.int64)
+    n_days = len(days)
+    school_days = weekday_mask(days) & (days <= np.datetime64(datetime.date.today()).astype(np.int64))
+    if holidays:
+        school_days &= ~np.isin(days, np.array(holidays, dtype="datetime64[D]").astype(np.int64))
+    range_params = (start_date.isoformat(), (end_date + datetime.timedelta(days=1)).isoformat())
+
+    class_filter = "AND users.school_class = ?" if school_class else ""
+    class_params = (school_class,) if school_class else ()
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT users.rowid, users.id, users.name, users.school_class
+            FROM users
+            WHERE 1 {class_filter}
+            ORDER BY users.rowid
+        """, class_params)
+        users = cursor.fetchall()
+
+        # Dagar utan en enda skanning på hela skolan räknas inte som skoldagar
+        cursor.execute("""
+            SELECT DISTINCT substr(timestamp, 1, 10)
+            FROM scans
+            WHERE timestamp >= ? AND timestamp < ?
+        """, range_params)
+        scan_days = np.array([row[0] for row in cursor.fetchall()], dtype="datetime64[D]").astype(np.int64)
+        school_days &= np.isin(days, scan_days)
+        user_rowids = np.array([user[0] for user in users], dtype=np.int64)
+        user_classes = [user[3] or NO_CLASS_LABEL for user in users]
+        classes, user_class = np.unique(np.array(user_classes, dtype=str), return_inverse=True)
+
+        # Första skanningen per elev och dag i sekunder efter midnatt, en hel dag betyder ingen skanning
+        first_scan = np.full(len(users) * n_days, SECONDS_PER_DAY, dtype=np.int64)
+
+        cursor.execute(f"""
+            SELECT users.rowid, CAST(strftime('%s', scans.timestamp) AS INTEGER)
+            FROM scans
+            JOIN users ON scans.card_id = users.id
+            WHERE scans.timestamp >= ? AND scans.timestamp < ? {class_filter}
+        """, range_params + class_params)
+        while True:
+            rows = cursor.fetchmany(REPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            chunk = np.array(rows, dtype=np.int64)
+            # Användare som registrerats efter att elevlistan lästes finns inte med och hoppas över
+            user_idx = np.searchsorted(user_rowids, chunk[:, 0])
+            known = user_idx < len(user_rowids)
+            known[known] = user_rowids[user_idx[known]] == chunk[known, 0]
+            chunk, user_idx = chunk[known], user_idx[known]
+            day_idx = chunk[:, 1] // SECONDS_PER_DAY - days[0]
+            np.minimum.at(first_scan, user_idx * n_days + day_idx, chunk[:, 1] % SECONDS_PER_DAY)
+    except sqlite3.Error as e:
+        logging.error(f"Databasfel: {e}")
+        return None
+    finally:
+        conn.close()
+
+    first_scan = first_scan.reshape(len(users), n_days)
+    present = first_scan < SECONDS_PER_DAY
+    absent = ~present & school_days
+    late = present & (first_scan > late_limit) & school_days
+
+    present_per_class = np.zeros((len(classes), n_days), dtype=np.int64)
+    np.add.at(present_per_class, user_class, present)
+
+    # Listor sorterade på datum, sedan elev
+    absent_day, absent_user = np.nonzero(absent.T)
+    late_day, late_user = np.nonzero(late.T)
+    date_labels = dates.astype(str).tolist()
+    report = {
+        "dates": dates,
+        "school_days": school_days,
+        "classes": classes,
+        "class_sizes": np.bincount(user_class, minlength=len(classes)),
+        "present": present_per_class,
+        "absent": [(date_labels[d], users[u][1], users[u][2], user_classes[u])
+                   for d, u in zip(absent_day, absent_user)],
+        "late": [(date_labels[d], users[u][1], users[u][2], user_classes[u], format_time_of_day(first_scan[u, d]))
+                 for d, u in zip(late_day, late_user)],
+    }
+    REPORT_CACHE[key] = report
+    while len(REPORT_CACHE) > REPORT_CACHE_SIZE:
+        REPORT_CACHE.popitem(last=False)  # Ta bort den rapport som användes för längst sedan
+    logging.info(f"Närvarorapport skapad: {school_class or 'alla klasser'}, {start_date} - {end_date}")
+    return report
+
+def attendance_rates(report, period="dag"):
+    """Närvarograd per klass och skoldag eller vecka.
+
+    Returnerar (etiketter, klasser, andelar) där andelar har en rad per klass
+    och en kolumn per period.
+    """
+    school_days = report["school_days"]
+    dates = report["dates"][school_days]
+    present = report["present"][:, school_days]
+
+    if period == "vecka":
+        # Gruppera dagarna per vecka med måndag som veckostart
+        week_starts, week_idx = np.unique(week_start_days(dates.astype(np.int64)), return_inverse=True)
+        in_week = week_idx[:, None] == np.arange(len(week_starts))
+        present = present @ in_week
+        days_per_period = in_week.sum(axis=0)
+        labels = week_starts.astype("datetime64[D]").astype(str)
+    else:
+        days_per_period = np.ones(len(dates), dtype=np.int64)
+        labels = dates.astype(str)
+
+    expected = report["class_sizes"][:, None] * days_per_period
+    rates = np.divide(present, expected, out=np.zeros(present.shape), where=expected > 0)
+    return labels.tolist(), report["classes"].tolist(), rates
+
+def run_report_cli(args):
+    """Skriv ut en närvarorapport i terminalen."""
+    parser = argparse.ArgumentParser(prog="main.py rapport", description="Närvarorapport per klass.")
+    parser.add_argument("--klass", help="Klass att rapportera, standard är alla klasser")
+    parser.add_argument("--start", required=True, help="Första datum, ÅÅÅÅ-MM-DD")
+    parser.add_argument("--slut", required=True, help="Sista datum, ÅÅÅÅ-MM-DD")
+    parser.add_argument("--period", choices=["dag", "vecka"], default="dag")
+    parser.add_argument("--skolstart", default=DEFAULT_SCHOOL_START, help="Schemastart, TT:MM")
+    parser.add_argument("--marginal", type=int, default=0, help="Minuter efter skolstart innan en elev räknas som sen")
+    parser.add_argument("--lov", default="", help="Lovdagar, kommaseparerade ÅÅÅÅ-MM-DD eller ÅÅÅÅ-MM-DD:ÅÅÅÅ-MM-DD")
+    parser.add_argument("--lista", action="store_true", help="Skriv även ut frånvarande och sena elever")
+    options = parser.parse_args(args)
+
+    try:
+        start_date = parse_report_date(options.start)
+        end_date = parse_report_date(options.slut)
+        holidays = parse_holidays(options.lov)
+    except ValueError:
+        parser.error("datum måste anges som ÅÅÅÅ-MM-DD")
+
+    report = build_attendance_report(options.klass, start_date, end_date, options.skolstart, options.marginal,
+                                     holidays)
+    if report is None:
+        print("Kunde inte skapa rapporten, se loggen för detaljer.")
+        return 1
+
+    labels, classes, rates = attendance_rates(report, options.period)
+    print("Klass\t" + "\t".join(labels))
+    for school_class, row in zip(classes, rates):
+        print(school_class + "\t" + "\t".join(f"{rate:.0%}" for rate in row))
+    print(f"Frånvarotillfällen: {len(report['absent'])}, sena ankomster: {len(report['late'])}")
+
+    if options.lista:
+        print("\nFrånvarande:")
+        for date, card_id, name, school_class in report["absent"]:
+            print(f"{date}\t{name} ({school_class})\t{card_id}")
+        print("\nSena:")
+        for date, card_id, name, school_class, time in report["late"]:
+            print(f"{date} {time}\t{name} ({school_class})\t{card_id}")
+    return 0
+
 class RFIDScannerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -331,7 +662,7 @@ class RFIDScannerApp(QMainWindow):
 
         # Meny
         self.menu = QComboBox()
-        self.menu.addItems(["Skanna kort", "Visa användare", "Visa senaste skanningar", "Statistik", "Registrera kort", "Rensa loggar", "Exportera data", "Importera användare", "Rensa databas"])
+        self.menu.addItems(["Skanna kort", "Visa användare", "Visa senaste skanningar", "Statistik", "Närvarorapport", "Registrera kort", "Registreringsläge", "Rensa loggar", "Exportera data", "Importera användare", "Rensa databas"])
         self.menu.currentIndexChanged.connect(self.switch_page)
         self.menu.setStyleSheet("""
             QComboBox {
@@ -363,49 +694,98 @@ class RFIDScannerApp(QMainWindow):
         self.timer = QTimer()
         self.timer.timeout.connect(self.clear_output)
 
-        # Aktuell ram för dynamiskt innehåll
-        self.current_frame = None
+        # Sidor byggs en gång och cachas i en QStackedWidget
+        self.page_stack = QStackedWidget()
+        self.layout.addWidget(self.page_stack)
+        self.pages = {}
+        self.dirty_pages = set()
+        self.page_builders = {
+            "scan": self.build_scan_page,
+            "users": self.build_user_list,
+            "scans": self.build_recent_scans,
+            "statistics": self.build_statistics,
+            "report": self.build_report_page,
+            "register": self.build_register_form,
+            "enrollment": self.build_enrollment_page,
+        }
+        self.page_refreshers = {
+            "users": self.refresh_user_list,
+            "scans": self.refresh_recent_scans,
+            "statistics": self.refresh_statistics,
+            "report": self.refresh_report_page,
+        }
+        add_data_listener(self.on_data_changed)
+
         self.pending_card_id = None
         self.show_scan_page()
 
-    def clear_page(self):
-        """Rensa det aktuella innehållet på skärmen."""
-        if self.current_frame:
-            self.layout.removeWidget(self.current_frame)
-            self.current_frame.deleteLater()
-            self.current_frame = None
+    def show_page(self, key, title):
+        """Visa en cachad sida och uppdatera den bara om dess data har ändrats."""
+        page = self.pages.get(key)
+        if page is None:
+            page = self.page_builders[key]()
+            self.pages[key] = page
+            self.page_stack.addWidget(page)
+            self.dirty_pages.add(key)
+        if key in self.dirty_pages:
+            self.refresh_page(key)
+        self.output_label.setText(title)
+        self.page_stack.setCurrentWidget(page)
+
+    def refresh_page(self, key):
+        """Läs om datan för en sida och markera den som aktuell."""
+        refresher = self.page_refreshers.get(key)
+        if refresher:
+            refresher()
+        self.dirty_pages.discard(key)
+
+    def on_data_changed(self, table):
+        """Markera sidor som beror på den ändrade tabellen som inaktuella."""
+        for key, tables in PAGE_DEPENDENCIES.items():
+            if table in tables and key in self.pages:
+                self.dirty_pages.add(key)
+                # Sidan som visas just nu uppdateras direkt
+                if self.page_stack.currentWidget() is self.pages[key]:
+                    self.refresh_page(key)
 
     def show_scan_page(self):
         """Visa skanningsläget."""
-        self.clear_page()
-        self.output_label.setText(tr("scan_prompt"))
-        self.current_frame = QWidget()
-        self.layout.addWidget(self.current_frame)
+        self.show_page("scan", tr("scan_prompt"))
+
+    def build_scan_page(self):
+        """Bygg skanningssidan."""
+        return QWidget()
 
     def show_user_list(self):
         """Visa alla registrerade användare."""
-        self.clear_page()
-        self.output_label.setText("Registrerade användare")
+        self.show_page("users", "Registrerade användare")
 
-        self.current_frame = QWidget()
-        table_layout = QVBoxLayout(self.current_frame)
+    def build_user_list(self):
+        """Bygg sidan med registrerade användare."""
+        page = QWidget()
+        table_layout = QVBoxLayout(page)
 
         # Lägg till sökruta
-        search_box = QLineEdit()
-        search_box.setPlaceholderText("Sök efter namn eller klass...")
-        search_box.textChanged.connect(self.filter_user_table)
-        table_layout.addWidget(search_box)
+        self.user_search_box = QLineEdit()
+        self.user_search_box.setPlaceholderText("Sök efter namn eller klass...")
+        self.user_search_box.textChanged.connect(self.filter_user_table)
+        table_layout.addWidget(self.user_search_box)
 
         # Lägg till uppdateringsknapp
         refresh_button = QPushButton("Uppdatera lista")
-        refresh_button.clicked.connect(self.show_user_list)
+        refresh_button.clicked.connect(lambda: self.refresh_page("users"))
         refresh_button.setStyleSheet("background-color: #555; color: white; font-size: 14px; padding: 5px; border-radius: 5px;")
         table_layout.addWidget(refresh_button)
 
         self.user_table = QTableWidget()
         self.user_table.setColumnCount(3)
         self.user_table.setHorizontalHeaderLabels(["Kort-ID", "Namn", "Klass"])
+        table_layout.addWidget(self.user_table)
+        return page
 
+    def refresh_user_list(self):
+        """Läs om användarna från databasen till tabellen."""
+        self.user_table.setRowCount(0)
         try:
             conn = sqlite3.connect(DB_FILE)
             cursor = conn.cursor()
@@ -427,8 +807,7 @@ class RFIDScannerApp(QMainWindow):
             delete_button.setStyleSheet("background-color: #ff4444; color: white; font-size: 12px; padding: 3px; border-radius: 3px;")
             self.user_table.setCellWidget(row, 2, delete_button)
 
-        table_layout.addWidget(self.user_table)
-        self.layout.addWidget(self.current_frame)
+        self.filter_user_table(self.user_search_box.text())
 
     def filter_user_table(self, text):
         """Filtrera användarlistan baserat på söktext."""
@@ -443,22 +822,28 @@ class RFIDScannerApp(QMainWindow):
 
     def show_recent_scans(self):
         """Visa de senaste skanningarna."""
-        self.clear_page()
-        self.output_label.setText("Senaste skanningar")
+        self.show_page("scans", "Senaste skanningar")
 
-        self.current_frame = QWidget()
-        table_layout = QVBoxLayout(self.current_frame)
+    def build_recent_scans(self):
+        """Bygg sidan med de senaste skanningarna."""
+        page = QWidget()
+        table_layout = QVBoxLayout(page)
 
         # Lägg till sökruta
-        search_box = QLineEdit()
-        search_box.setPlaceholderText("Sök efter namn eller tidstämpel...")
-        search_box.textChanged.connect(self.filter_scan_table)
-        table_layout.addWidget(search_box)
+        self.scan_search_box = QLineEdit()
+        self.scan_search_box.setPlaceholderText("Sök efter namn eller tidstämpel...")
+        self.scan_search_box.textChanged.connect(self.filter_scan_table)
+        table_layout.addWidget(self.scan_search_box)
 
         self.scan_table = QTableWidget()
         self.scan_table.setColumnCount(3)
         self.scan_table.setHorizontalHeaderLabels(["Kort-ID", "Namn", "Tidstämpel"])
+        table_layout.addWidget(self.scan_table)
+        return page
 
+    def refresh_recent_scans(self):
+        """Läs om de senaste skanningarna från databasen till tabellen."""
+        self.scan_table.setRowCount(0)
         try:
             conn = sqlite3.connect(DB_FILE)
             cursor = conn.cursor()
@@ -480,8 +865,7 @@ class RFIDScannerApp(QMainWindow):
         finally:
             conn.close()
 
-        table_layout.addWidget(self.scan_table)
-        self.layout.addWidget(self.current_frame)
+        self.filter_scan_table(self.scan_search_box.text())
 
     def filter_scan_table(self, text):
         """Filtrera skanningstabellen baserat på söktext."""
@@ -496,13 +880,26 @@ class RFIDScannerApp(QMainWindow):
 
     def show_statistics(self):
         """Visa statistik över antal skanningar per användare."""
-        self.clear_page()
-        self.output_label.setText("Statistik")
+        self.show_page("statistics", "Statistik")
 
-        self.current_frame = QWidget()
-        table_layout = QVBoxLayout(self.current_frame)
+    def build_statistics(self):
+        """Bygg statistiksidan med ett tomt diagram."""
+        page = QWidget()
+        table_layout = QVBoxLayout(page)
 
         # Skapa ett diagram med matplotlib
+        self.stats_figure, self.stats_ax = plt.subplots()
+
+        # Lägg till logga som vattenstämpel
+        self.stats_figure.text(0.5, 0.5, "PresencePoint", fontsize=40, color='gray', alpha=0.2,
+                               ha='center', va='center', rotation=30)
+
+        self.stats_canvas = FigureCanvas(self.stats_figure)
+        table_layout.addWidget(self.stats_canvas)
+        return page
+
+    def refresh_statistics(self):
+        """Rita om diagrammet med aktuella skanningar per användare."""
         try:
             conn = sqlite3.connect(DB_FILE)
             cursor = conn.cursor()
@@ -517,42 +914,144 @@ class RFIDScannerApp(QMainWindow):
             names = [stat[0] for stat in stats]
             counts = [stat[1] for stat in stats]
 
-            fig, ax = plt.subplots()
+            ax = self.stats_ax
+            ax.clear()
             ax.bar(names, counts)
             ax.set_xlabel("Användare")
             ax.set_ylabel("Antal skanningar")
             ax.set_title("Statistik över skanningar")
+            self.stats_canvas.draw_idle()
+        except sqlite3.Error as e:
+            logging.error(f"Databasfel: {e}")
+        finally:
+            conn.close()
 
-            # Lägg till logga som vattenstämpel
-            fig.text(0.5, 0.5, "PresencePoint", fontsize=40, color='gray', alpha=0.2,
-                     ha='center', va='center', rotation=30)
-
-            canvas = FigureCanvas(fig)
-            table_layout.addWidget(canvas)
+    def show_report_page(self):
+        """Visa sidan för närvarorapporter."""
+        self.show_page("report", "Närvarorapport")
+
+    def build_report_page(self):
+        """Bygg sidan för närvarorapporter."""
+        page = QWidget()
+        report_layout = QVBoxLayout(page)
+
+        controls_layout = QHBoxLayout()
+        self.report_class_box = QComboBox()
+        self.report_start_input = QLineEdit((datetime.date.today() - datetime.timedelta(days=27)).isoformat())
+        self.report_end_input = QLineEdit(datetime.date.today().isoformat())
+        self.report_school_start_input = QLineEdit(DEFAULT_SCHOOL_START)
+        self.report_grace_input = QLineEdit("0")
+        self.report_holidays_input = QLineEdit()
+        self.report_period_box = QComboBox()
+        self.report_period_box.addItems(["dag", "vecka"])
+        report_button = QPushButton("Skapa rapport")
+        report_button.clicked.connect(self.create_report)
+        report_button.setStyleSheet("background-color: #555; color: white; font-size: 14px; padding: 5px; border-radius: 5px;")
+
+        self.report_start_input.setPlaceholderText("Från ÅÅÅÅ-MM-DD")
+        self.report_end_input.setPlaceholderText("Till ÅÅÅÅ-MM-DD")
+        self.report_school_start_input.setPlaceholderText("Skolstart TT:MM")
+        self.report_grace_input.setPlaceholderText("Marginal i minuter")
+        self.report_holidays_input.setPlaceholderText("Lovdagar, t.ex. 2026-02-23:2026-02-27")
+
+        for widget in (self.report_class_box, self.report_start_input, self.report_end_input,
+                       self.report_school_start_input, self.report_grace_input, self.report_holidays_input,
+                       self.report_period_box, report_button):
+            controls_layout.addWidget(widget)
+        report_layout.addLayout(controls_layout)
+
+        self.report_table = QTableWidget()
+        report_layout.addWidget(self.report_table)
+
+        self.report_details = QTextEdit()
+        self.report_details.setReadOnly(True)
+        report_layout.addWidget(self.report_details)
+        return page
+
+    def refresh_report_page(self):
+        """Uppdatera listan med klasser i rapportsidan."""
+        selected = self.report_class_box.currentText()
+        self.report_class_box.clear()
+        self.report_class_box.addItem("Alla klasser")
+        try:
+            conn = sqlite3.connect(DB_FILE)
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT school_class FROM users ORDER BY school_class")
+            self.report_class_box.addItems([row[0] for row in cursor.fetchall() if row[0]])
         except sqlite3.Error as e:
             logging.error(f"Databasfel: {e}")
         finally:
             conn.close()
 
-        self.layout.addWidget(self.current_frame)
+        index = self.report_class_box.findText(selected)
+        if index >= 0:
+            self.report_class_box.setCurrentIndex(index)
+
+    def create_report(self):
+        """Skapa och visa en närvarorapport för vald klass och period."""
+        school_class = self.report_class_box.currentText()
+        if self.report_class_box.currentIndex() == 0:
+            school_class = None
+        try:
+            start_date = parse_report_date(self.report_start_input.text())
+            end_date = parse_report_date(self.report_end_input.text())
+            holidays = parse_holidays(self.report_holidays_input.text())
+        except ValueError:
+            self.output_label.setText("Datum måste anges som ÅÅÅÅ-MM-DD!")
+            return
+        try:
+            grace_minutes = int(self.report_grace_input.text().strip() or 0)
+        except ValueError:
+            self.output_label.setText("Marginalen måste anges i hela minuter!")
+            return
+
+        report = build_attendance_report(school_class, start_date, end_date,
+                                         self.report_school_start_input.text().strip(), grace_minutes, holidays)
+        if report is None:
+            self.output_label.setText("Kunde inte skapa rapporten!")
+            return
+
+        labels, classes, rates = attendance_rates(report, self.report_period_box.currentText())
+        self.report_table.clear()
+        self.report_table.setRowCount(len(classes))
+        self.report_table.setColumnCount(len(labels))
+        self.report_table.setHorizontalHeaderLabels(labels)
+        self.report_table.setVerticalHeaderLabels(classes)
+        for row, class_rates in enumerate(rates):
+            for col, rate in enumerate(class_rates):
+                self.report_table.setItem(row, col, QTableWidgetItem(f"{rate:.0%}"))
+
+        lines = [f"Frånvarande ({len(report['absent'])}):"]
+        lines += [f"{date}  {name} ({user_class})" for date, _, name, user_class in report["absent"]]
+        lines += ["", f"Sena ({len(report['late'])}):"]
+        lines += [f"{date} {time}  {name} ({user_class})" for date, _, name, user_class, time in report["late"]]
+        self.report_details.setPlainText("\n".join(lines))
+        self.output_label.setText("Närvarorapport")
 
     def show_register_form(self):
         """Visa registreringsformulär för nya kort."""
-        self.clear_page()
-        self.output_label.setText("Registrera nytt kort")
-
-        self.current_frame = QWidget()
-        register_layout = QVBoxLayout(self.current_frame)
+        self.show_page("register", "Registrera nytt kort")
 
-        self.card_id_input = QLineEdit()
-        self.name_input = QLineEdit()
-        self.class_input = QLineEdit()
-        register_button = QPushButton("Registrera")
+        self.name_input.clear()
+        self.class_input.clear()
 
         # Fyll i kort-ID automatiskt om det finns ett väntande kort-ID
         if self.pending_card_id:
             self.card_id_input.setText(self.pending_card_id)
             self.card_id_input.setReadOnly(True)  # Gör fältet skrivskyddat för att undvika ändringar
+        else:
+            self.card_id_input.clear()
+            self.card_id_input.setReadOnly(False)
+
+    def build_register_form(self):
+        """Bygg registreringsformuläret."""
+        page = QWidget()
+        register_layout = QVBoxLayout(page)
+
+        self.card_id_input = QLineEdit()
+        self.name_input = QLineEdit()
+        self.class_input = QLineEdit()
+        register_button = QPushButton("Registrera")
 
         self.card_id_input.setPlaceholderText("Kort-ID")
         self.name_input.setPlaceholderText("Namn")
@@ -564,8 +1063,145 @@ class RFIDScannerApp(QMainWindow):
         register_layout.addWidget(self.name_input)
         register_layout.addWidget(self.class_input)
         register_layout.addWidget(register_button)
+        return page
+
+    def show_enrollment_page(self):
+        """Visa registreringsläget där okända kort köas för registrering i klump."""
+        self.show_page("enrollment", "Registreringsläge - skanna nya kort")
+
+    def build_enrollment_page(self):
+        """Bygg sidan för registreringsläget."""
+        page = QWidget()
+        enrollment_layout = QVBoxLayout(page)
+
+        # Namn ur importerad klasslista som ännu inte har fått ett kort
+        self.roster_queue = []
+
+        buttons_layout = QHBoxLayout()
+        import_button = QPushButton("Importera klasslista")
+        import_button.clicked.connect(self.import_roster)
+        remove_button = QPushButton("Ta bort markerade")
+        remove_button.clicked.connect(self.remove_enrollment_rows)
+        register_button = QPushButton("Registrera alla")
+        register_button.clicked.connect(self.register_enrollment_queue)
+        for button in (import_button, remove_button, register_button):
+            button.setStyleSheet("background-color: #555; color: white; font-size: 14px; padding: 5px; border-radius: 5px;")
+            buttons_layout.addWidget(button)
+        enrollment_layout.addLayout(buttons_layout)
+
+        self.enrollment_table = QTableWidget()
+        self.enrollment_table.setColumnCount(3)
+        self.enrollment_table.setHorizontalHeaderLabels(["Kort-ID", "Namn", "Klass"])
+        # Bara dubbelklick eller redigeringstangenten öppnar en cell, annars hamnar skannade siffror i cellen
+        self.enrollment_table.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+        enrollment_layout.addWidget(self.enrollment_table)
+        return page
+
+    def is_manual_input(self, widget):
+        """Kontrollera om widgeten är ett fält där personalen skriver för hand."""
+        if widget is None:
+            return False
+        if any(widget is getattr(self, field, None) for field in MANUAL_INPUT_FIELDS):
+            return True
+        # Cellredigeraren i registreringskön är ett barn till tabellen
+        table = getattr(self, "enrollment_table", None)
+        return table is not None and widget is not table and table.isAncestorOf(widget)
+
+    def enrollment_active(self):
+        """Kontrollera om registreringsläget visas."""
+        page = self.pages.get("enrollment")
+        return page is not None and self.page_stack.currentWidget() is page
+
+    def queue_enrollment_card(self, card_id):
+        """Lägg ett okänt kort i registreringskön utan att avbryta skanningen."""
+        for row in range(self.enrollment_table.rowCount()):
+            if self.enrollment_table.item(row, 0).text() == card_id:
+                self.output_label.setText(f"Kort {card_id} finns redan i kön")
+                return
+
+        row = self.enrollment_table.rowCount()
+        self.enrollment_table.insertRow(row)
+        card_item = QTableWidgetItem(card_id)
+        card_item.setFlags(card_item.flags() & ~Qt.ItemIsEditable)
+        self.enrollment_table.setItem(row, 0, card_item)
+
+        # Para ihop kortet med nästa namn i klasslistan
+        name, school_class = self.roster_queue.pop(0) if self.roster_queue else ("", "")
+        self.enrollment_table.setItem(row, 1, QTableWidgetItem(name))
+        self.enrollment_table.setItem(row, 2, QTableWidgetItem(school_class))
+        self.enrollment_table.scrollToBottom()
+        self.show_enrollment_status(f"Kort {card_id} köat" + (f" för {name} ({school_class})" if name else ""))
+
+    def import_roster(self):
+        """Importera en klasslista och para ihop den med köade kort i skanningsordning."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Öppna klasslista", "", "CSV-filer (*.csv)")
+        if not file_path:
+            return
+
+        roster = read_roster(file_path)
+        if roster is None:
+            self.show_enrollment_status("Klasslistan kunde inte läsas")
+            return
+        if not roster:
+            self.show_enrollment_status("Inga namn hittades i klasslistan")
+            return
+
+        self.roster_queue.extend(roster)
+        for row in range(self.enrollment_table.rowCount()):
+            if not self.roster_queue:
+                break
+            name_item = self.enrollment_table.item(row, 1)
+            if not name_item.text().strip():
+                name, school_class = self.roster_queue.pop(0)
+                name_item.setText(name)
+                self.enrollment_table.item(row, 2).setText(school_class)
+        self.show_enrollment_status(f"{len(roster)} namn importerade från klasslistan")
+
+    def remove_enrollment_rows(self):
+        """Ta bort markerade kort ur registreringskön och lägg tillbaka deras namn i klasslistan."""
+        rows = sorted({index.row() for index in self.enrollment_table.selectedIndexes()})
+        returned = []
+        for row in rows:
+            name, school_class = (self.enrollment_table.item(row, col).text().strip() for col in (1, 2))
+            if name:
+                returned.append((name, school_class))
+        self.roster_queue[:0] = returned
+        for row in reversed(rows):
+            self.enrollment_table.removeRow(row)
+        self.show_enrollment_status(f"{len(rows)} kort borttagna ur kön")
+
+    def register_enrollment_queue(self):
+        """Registrera alla kompletta rader i kön i en enda transaktion."""
+        users = []
+        complete_rows = []
+        for row in range(self.enrollment_table.rowCount()):
+            card_id, name, school_class = (self.enrollment_table.item(row, col).text().strip() for col in range(3))
+            if card_id and name and school_class:
+                users.append((card_id, name, school_class))
+                complete_rows.append(row)
+
+        if not users:
+            self.output_label.setText("Inga kompletta rader att registrera!")
+            return
+
+        skipped = register_cards(users)
+        if skipped is None:
+            self.show_enrollment_status("Registreringen misslyckades, kön är kvar")
+            return
+
+        # Kort som redan var registrerade ligger kvar i kön så att personalen ser dem
+        for row, (card_id, _, _) in reversed(list(zip(complete_rows, users))):
+            if card_id not in skipped:
+                self.enrollment_table.removeRow(row)
+        message = f"{len(users) - len(skipped)} kort registrerade"
+        if skipped:
+            message += f", redan registrerade: {', '.join(skipped)}"
+        self.show_enrollment_status(message)
 
-        self.layout.addWidget(self.current_frame)
+    def show_enrollment_status(self, message):
+        """Visa ett meddelande tillsammans med köns status."""
+        self.output_label.setText(f"{message} - {self.enrollment_table.rowCount()} kort i kön, "
+                                  f"{len(self.roster_queue)} namn kvar i klasslistan")
 
     def register_new_card(self):
         """Registrera ett nytt kort."""
@@ -595,8 +1231,7 @@ class RFIDScannerApp(QMainWindow):
         reply = QMessageBox.question(self, tr("delete_user"), tr("delete_confirm").format(card_id),
                                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            delete_user(card_id)
-            self.show_user_list()  # Uppdatera användarlistan
+            delete_user(card_id)  # Användarlistan uppdateras via notify_data_changed
 
     def process_card_input(self, card_id):
         """Hantera kortskanning."""
@@ -614,6 +1249,9 @@ class RFIDScannerApp(QMainWindow):
             log_scan(card_id)  # Logga skanningen i både databasen och CSV-filen
             self.output_label.setText(f"{name} ({school_class}) har skannat in sig")
             self.timer.start(CLEAR_DELAY)
+        elif self.enrollment_active():
+            # I registreringsläget köas okända kort utan dialogruta
+            self.queue_enrollment_card(card_id)
         else:
             # Fråga användaren om de vill registrera kortet
             reply = QMessageBox.question(
@@ -624,9 +1262,8 @@ class RFIDScannerApp(QMainWindow):
                 QMessageBox.Yes
             )
             if reply == QMessageBox.Yes:
-                self.output_label.setText("Registrera nytt kort")
-                self.show_register_form()
                 self.pending_card_id = card_id  # Spara kort-ID för att fylla i formuläret automatiskt
+                self.show_register_form()
             else:
                 self.output_label.setText(tr("scan_prompt"))
 
@@ -646,14 +1283,18 @@ class RFIDScannerApp(QMainWindow):
         elif index == 3:
             self.show_statistics()
         elif index == 4:
-            self.show_register_form()
+            self.show_report_page()
         elif index == 5:
-            self.clear_logs()
+            self.show_register_form()
         elif index == 6:
-            export_to_csv()
+            self.show_enrollment_page()
         elif index == 7:
-            import_users_from_csv()
+            self.clear_logs()
         elif index == 8:
+            export_to_csv()
+        elif index == 9:
+            import_users_from_csv()
+        elif index == 10:
             self.clear_database_prompt()
 
     def clear_logs(self):
@@ -683,6 +1324,10 @@ class KeyEventFilter(QObject):
 
     def eventFilter(self, obj, event):
         if event.type() == QEvent.KeyPress:
+            # Text som skrivs i formulärfälten ska inte tolkas som en kortskanning
+            if self.app_window.is_manual_input(QApplication.focusWidget()):
+                self.buffer = ""
+                return super().eventFilter(obj, event)
             char = event.text()
             if char.isprintable():
                 self.buffer += char
@@ -695,6 +1340,9 @@ class KeyEventFilter(QObject):
 
 def main():
     initialize_database()
+    # Kör närvarorapporten i terminalen: python main.py rapport --start ÅÅÅÅ-MM-DD --slut ÅÅÅÅ-MM-DD
+    if len(sys.argv) > 1 and sys.argv[1] == "rapport":
+        sys.exit(run_report_cli(sys.argv[2:]))
     initialize_csv()
     app = QApplication(sys.argv)
     window = RFIDScannerApp()
@@ -0,0 +1,61 @@
+"""Mät hur lång tid en närvarorapport för hela skolan tar på en syntetisk termin.
+
+Kör med: python tests/bench_report.py [antal elever] [antal dagar]
+"""
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import conftest  # noqa: F401  Samma sökväg som testerna
+import main
+
+
+def create_database(db_file, students, days, start):
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT, school_class TEXT)")
+    conn.execute("CREATE TABLE scans (id INTEGER PRIMARY KEY AUTOINCREMENT, card_id TEXT, timestamp TEXT)")
+    conn.execute("CREATE INDEX idx_scans_timestamp ON scans (timestamp)")
+    users = [(f"{i:010d}", f"Elev {i}", f"K{i % 40}") for i in range(students)]
+    conn.executemany("INSERT INTO users (id, name, school_class) VALUES (?, ?, ?)", users)
+
+    random.seed(1)
+    scans = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        if day.weekday() >= 5:
+            continue
+        for card_id, _, _ in users:
+            if random.random() < 0.9:
+                for lesson in range(3):
+                    scanned = datetime.datetime.combine(day, datetime.time(7, 30)) + datetime.timedelta(
+                        minutes=random.randint(0, 60) + lesson * 120)
+                    scans.append((card_id, scanned.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("INSERT INTO scans (card_id, timestamp) VALUES (?, ?)", scans)
+    conn.commit()
+    conn.close()
+    return len(scans)
+
+
+def main_bench():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 1200
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 120
+    start = datetime.date(2025, 8, 18)
+    end = start + datetime.timedelta(days=days - 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        main.DB_FILE = os.path.join(directory, "bench.db")
+        scan_count = create_database(main.DB_FILE, students, days, start)
+
+        started = time.perf_counter()
+        report = main.build_attendance_report(None, start, end)
+        main.attendance_rates(report, "vecka")
+        elapsed = time.perf_counter() - started
+        print(f"{students} elever, {scan_count} skanningar, {days} dagar: {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# Testerna körs utan skärm och importerar main.py från projektroten
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app_window(tmp_path, monkeypatch):
+    """Huvudfönster mot en tillfällig databas, utan att hämta loggan från nätet."""
+    import main
+    from PyQt5.QtGui import QPixmap
+    from PyQt5.QtWidgets import QApplication
+
+    monkeypatch.setattr(main, "DB_FILE", str(tmp_path / "rfid_users.db"))
+    monkeypatch.setattr(main, "CSV_FILE", str(tmp_path / "rfid_log.csv"))
+    monkeypatch.setattr(main, "BACKUP_CSV_FILE", str(tmp_path / "backup_rfid_log.csv"))
+    monkeypatch.setattr(main, "load_logo", QPixmap)
+    main.initialize_database()
+    main.initialize_csv()
+
+    app = QApplication.instance() or QApplication([])
+    window = main.RFIDScannerApp()
+    window.show()
+    app.processEvents()
+    yield window
+    main.DATA_LISTENERS.remove(window.on_data_changed)
+    window.close()
+    window.deleteLater()
+    app.processEvents()
@@ -0,0 +1,140 @@
+import sqlite3
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def users_db(tmp_path, monkeypatch):
+    """Tom databas där backup-exporten bara räknas."""
+    db_file = str(tmp_path / "rfid_users.db")
+    monkeypatch.setattr(main, "DB_FILE", db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT, school_class TEXT)")
+    conn.execute("INSERT INTO users (id, name, school_class) VALUES ('1', 'Anna', '23TEP')")
+    conn.commit()
+    conn.close()
+
+    backups = []
+    monkeypatch.setattr(main, "export_to_csv", backups.append)
+    return db_file, backups
+
+
+def stored_users(db_file):
+    conn = sqlite3.connect(db_file)
+    users = conn.execute("SELECT id, name, school_class FROM users ORDER BY id").fetchall()
+    conn.close()
+    return users
+
+
+def test_register_cards_commits_once_and_returns_skipped(users_db, monkeypatch):
+    db_file, backups = users_db
+    commits = []
+    real_connect = sqlite3.connect
+
+    class Connection:
+        def __init__(self, path):
+            self.conn = real_connect(path)
+
+        def commit(self):
+            commits.append(True)
+            self.conn.commit()
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+    monkeypatch.setattr(main.sqlite3, "connect", Connection)
+    skipped = main.register_cards([("1", "Dubblett", "X"), ("2", "Bo", "23TEI"), ("3", "Cilla", "23TEP")])
+
+    assert skipped == ["1"]
+    assert len(commits) == 1
+    assert backups == [main.BACKUP_CSV_FILE]
+    assert stored_users(db_file) == [("1", "Anna", "23TEP"), ("2", "Bo", "23TEI"), ("3", "Cilla", "23TEP")]
+
+
+def test_register_cards_failure_registers_nothing(users_db):
+    db_file, backups = users_db
+    conn = sqlite3.connect(db_file)
+    conn.execute("""
+        CREATE TRIGGER reject_name BEFORE INSERT ON users WHEN NEW.name = 'Fel'
+        BEGIN SELECT RAISE(ABORT, 'fel namn'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    assert main.register_cards([("2", "Bo", "23TEI"), ("3", "Fel", "23TEP")]) is None
+    assert backups == []
+    assert stored_users(db_file) == [("1", "Anna", "23TEP")]
+
+
+def write_roster(tmp_path, data):
+    path = tmp_path / "klasslista.csv"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_read_roster_skips_header_blank_and_short_rows(tmp_path):
+    path = write_roster(tmp_path, "Namn,Klass\nAnna,23TEP\n\nBo\n ,23TEI\nCilla , 23TEI \n".encode("utf-8"))
+    assert main.read_roster(path) == [("Anna", "23TEP"), ("Cilla", "23TEI")]
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "cp1252"])
+def test_read_roster_encodings(tmp_path, encoding):
+    path = write_roster(tmp_path, "Namn,Klass\nÅsa Öberg,23TEP\n".encode(encoding))
+    assert main.read_roster(path) == [("Åsa Öberg", "23TEP")]
+
+
+def test_read_roster_unreadable(tmp_path):
+    # 0x81 är odefinierad i Windows-1252 och ogiltig UTF-8
+    assert main.read_roster(write_roster(tmp_path, b"Namn,Klass\n\x81,23TEP\n")) is None
+    assert main.read_roster(str(tmp_path / "saknas.csv")) is None
+
+
+def queue_rows(window):
+    table = window.enrollment_table
+    return [[table.item(row, col).text() for col in range(3)] for row in range(table.rowCount())]
+
+
+def test_queue_matches_roster_in_scan_order(app_window):
+    app_window.show_enrollment_page()
+    app_window.queue_enrollment_card("10")
+    app_window.roster_queue.extend([("Anna", "23TEP"), ("Bo", "23TEI")])
+    app_window.queue_enrollment_card("11")
+    app_window.queue_enrollment_card("11")
+    assert queue_rows(app_window) == [["10", "", ""], ["11", "Anna", "23TEP"]]
+
+
+def test_removed_rows_return_names_to_roster(app_window):
+    app_window.show_enrollment_page()
+    app_window.roster_queue.extend([("Anna", "23TEP"), ("Bo", "23TEI"), ("Cilla", "23TEP")])
+    for card_id in ("10", "11", "12"):
+        app_window.queue_enrollment_card(card_id)
+    app_window.enrollment_table.selectRow(0)
+    app_window.remove_enrollment_rows()
+    assert app_window.roster_queue == [("Anna", "23TEP")]
+
+    app_window.queue_enrollment_card("13")
+    assert queue_rows(app_window) == [["11", "Bo", "23TEI"], ["12", "Cilla", "23TEP"], ["13", "Anna", "23TEP"]]
+
+
+def test_register_queue_keeps_rows_on_failure(app_window, monkeypatch):
+    app_window.show_enrollment_page()
+    app_window.roster_queue.append(("Anna", "23TEP"))
+    app_window.queue_enrollment_card("10")
+    monkeypatch.setattr(main, "register_cards", lambda users: None)
+    app_window.register_enrollment_queue()
+    assert queue_rows(app_window) == [["10", "Anna", "23TEP"]]
+    assert "misslyckades" in app_window.output_label.text()
+
+
+def test_register_queue_keeps_skipped_and_incomplete_rows(app_window):
+    app_window.show_enrollment_page()
+    app_window.roster_queue.extend([("Dubblett", "X"), ("Bo", "23TEI")])
+    for card_id in ("1095297406", "11", "12"):
+        app_window.queue_enrollment_card(card_id)
+    app_window.register_enrollment_queue()
+
+    assert queue_rows(app_window) == [["1095297406", "Dubblett", "X"], ["12", "", ""]]
+    assert main.get_user_info("11") == ("Bo", "23TEI")
+    assert "1095297406" in app_window.output_label.text()
@@ -0,0 +1,60 @@
+import main
+
+
+def count_refreshes(window):
+    """Räkna uppdateringar per sida utan att ändra vad de gör."""
+    counts = {key: 0 for key in window.page_refreshers}
+    for key, refresher in list(window.page_refreshers.items()):
+        def counted(key=key, refresher=refresher):
+            counts[key] += 1
+            refresher()
+        window.page_refreshers[key] = counted
+    return counts
+
+
+def test_only_built_dependent_pages_are_marked_dirty(app_window):
+    app_window.show_user_list()
+    app_window.show_recent_scans()
+    app_window.show_scan_page()
+    assert app_window.dirty_pages == set()
+
+    app_window.on_data_changed("scans")
+    # Användarlistan beror inte på skanningar och statistiken är inte byggd än
+    assert app_window.dirty_pages == {"scans"}
+
+    app_window.on_data_changed("users")
+    assert app_window.dirty_pages == {"scans", "users"}
+    assert "statistics" not in app_window.pages
+
+
+def test_visible_page_refreshes_immediately(app_window):
+    app_window.show_recent_scans()
+    counts = count_refreshes(app_window)
+    main.log_scan("1095297406")
+
+    assert counts["scans"] == 1
+    assert "scans" not in app_window.dirty_pages
+    assert app_window.scan_table.rowCount() == 1
+    assert app_window.scan_table.item(0, 0).text() == "1095297406"
+
+
+def test_hidden_page_refreshes_on_next_show(app_window):
+    app_window.show_user_list()
+    rows_before = app_window.user_table.rowCount()
+    app_window.show_scan_page()
+    counts = count_refreshes(app_window)
+
+    main.register_card("42", "Ny Elev", "23TEP")
+    assert counts["users"] == 0
+    assert "users" in app_window.dirty_pages
+    assert app_window.user_table.rowCount() == rows_before
+
+    app_window.show_user_list()
+    assert counts["users"] == 1
+    assert app_window.user_table.rowCount() == rows_before + 1
+    assert "users" not in app_window.dirty_pages
+
+    # Ett nytt besök utan ändringar läser inte om datan
+    app_window.show_scan_page()
+    app_window.show_user_list()
+    assert counts["users"] == 1
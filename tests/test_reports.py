@@ -0,0 +1,177 @@
+import datetime
+import sqlite3
+
+import numpy as np
+import pytest
+
+import main
+
+
+def day_numbers(*dates):
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+@pytest.fixture
+def report_db(tmp_path, monkeypatch):
+    """Databas med två klasser och en elev utan klass."""
+    db_file = str(tmp_path / "rfid_users.db")
+    monkeypatch.setattr(main, "DB_FILE", db_file)
+    main.REPORT_CACHE.clear()
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT, school_class TEXT)")
+    conn.execute("CREATE TABLE scans (id INTEGER PRIMARY KEY AUTOINCREMENT, card_id TEXT, timestamp TEXT)")
+    conn.executemany("INSERT INTO users (id, name, school_class) VALUES (?, ?, ?)", [
+        ("1", "Anna", "23TEP"),
+        ("2", "Bo", "23TEI"),
+        ("3", "Cilla", None),
+    ])
+    # Måndag 2026-02-02 till fredag 2026-02-06, onsdagen saknar skanningar
+    conn.executemany("INSERT INTO scans (card_id, timestamp) VALUES (?, ?)", [
+        ("1", "2026-02-02 08:00:00"),
+        ("1", "2026-02-02 12:00:00"),
+        ("2", "2026-02-02 08:20:00"),
+        ("3", "2026-02-02 07:55:00"),
+        ("1", "2026-02-03 08:16:00"),
+        ("3", "2026-02-03 08:10:00"),
+        ("1", "2026-02-05 08:00:00"),
+        ("2", "2026-02-05 08:00:00"),
+        ("3", "2026-02-06 08:00:00"),
+    ])
+    conn.commit()
+    conn.close()
+    return db_file
+
+
+def test_weekday_mask():
+    days = day_numbers(*(f"2026-02-0{i}" for i in range(2, 9)))
+    assert main.weekday_mask(days).tolist() == [True, True, True, True, True, False, False]
+
+
+def test_week_start_days():
+    days = day_numbers("2026-02-02", "2026-02-04", "2026-02-08", "2026-02-09", "1970-01-01")
+    starts = main.week_start_days(days).astype("datetime64[D]").astype(str).tolist()
+    assert starts == ["2026-02-02", "2026-02-02", "2026-02-02", "2026-02-09", "1969-12-29"]
+
+
+def test_late_limit_seconds():
+    assert main.late_limit_seconds("08:15") == 8 * 3600 + 15 * 60
+    assert main.late_limit_seconds("08:15", 5) == 8 * 3600 + 20 * 60
+    for text in ("8", "08:60", "25:00", "xx:yy"):
+        with pytest.raises(ValueError):
+            main.late_limit_seconds(text)
+
+
+def test_format_time_of_day():
+    assert main.format_time_of_day(0) == "00:00"
+    assert main.format_time_of_day(8 * 3600 + 5 * 60 + 59) == "08:05"
+
+
+def test_parse_holidays():
+    holidays = main.parse_holidays("2026-02-23:2026-02-25, 2026-04-03")
+    assert sorted(holidays) == [datetime.date(2026, 2, 23), datetime.date(2026, 2, 24),
+                                datetime.date(2026, 2, 25), datetime.date(2026, 4, 3)]
+    assert main.parse_holidays("") == set()
+
+
+def test_report_skips_days_without_scans_and_holidays(report_db):
+    report = main.build_attendance_report(None, datetime.date(2026, 2, 2), datetime.date(2026, 2, 8),
+                                          holidays={datetime.date(2026, 2, 6)})
+    # Onsdagen saknar skanningar, fredagen är lov och helgen räknas inte
+    assert report["school_days"].tolist() == [True, True, False, True, False, False, False]
+    assert report["absent"] == [
+        ("2026-02-03", "2", "Bo", "23TEI"),
+        ("2026-02-05", "3", "Cilla", main.NO_CLASS_LABEL),
+    ]
+
+
+def test_report_late_arrivals_with_grace(report_db):
+    start, end = datetime.date(2026, 2, 2), datetime.date(2026, 2, 6)
+    late = main.build_attendance_report(None, start, end, "08:15")["late"]
+    assert late == [("2026-02-02", "2", "Bo", "23TEI", "08:20"), ("2026-02-03", "1", "Anna", "23TEP", "08:16")]
+    late = main.build_attendance_report(None, start, end, "08:15", 2)["late"]
+    assert late == [("2026-02-02", "2", "Bo", "23TEI", "08:20")]
+
+
+def test_report_class_filter(report_db):
+    report = main.build_attendance_report("23TEP", datetime.date(2026, 2, 2), datetime.date(2026, 2, 6))
+    # Fredagen räknas eftersom någon i en annan klass har skannat
+    assert report["classes"].tolist() == ["23TEP"]
+    assert report["absent"] == [("2026-02-06", "1", "Anna", "23TEP")]
+
+
+def test_report_ignores_future_days(report_db, monkeypatch):
+    class FixedDate(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls(2026, 2, 3)
+
+    monkeypatch.setattr(main.datetime, "date", FixedDate)
+    report = main.build_attendance_report(None, FixedDate(2026, 2, 2), FixedDate(2026, 2, 6))
+    assert report["school_days"].tolist() == [True, True, False, False, False]
+
+
+def test_attendance_rates_per_day_and_week(report_db):
+    report = main.build_attendance_report(None, datetime.date(2026, 2, 2), datetime.date(2026, 2, 10))
+    labels, classes, rates = main.attendance_rates(report)
+    assert labels == ["2026-02-02", "2026-02-03", "2026-02-05", "2026-02-06"]
+    assert classes == ["23TEI", "23TEP", main.NO_CLASS_LABEL]
+    assert rates.tolist() == [[1.0, 0.0, 1.0, 0.0], [1.0, 1.0, 1.0, 0.0], [1.0, 1.0, 0.0, 1.0]]
+
+    labels, classes, rates = main.attendance_rates(report, "vecka")
+    assert labels == ["2026-02-02"]
+    assert rates.tolist() == [[0.5], [0.75], [0.75]]
+
+
+def test_report_cache_survives_scans_for_past_ranges(report_db):
+    start, end = datetime.date(2026, 2, 2), datetime.date(2026, 2, 6)
+    report = main.build_attendance_report(None, start, end)
+    main.clear_report_cache("scans")
+    assert main.build_attendance_report(None, start, end) is report
+    main.clear_report_cache("users")
+    assert main.build_attendance_report(None, start, end) is not report
+
+
+def test_report_skips_users_registered_during_the_report(report_db, monkeypatch):
+    # Simulera att ett kort registreras och skannas mellan elev- och skanningsfrågan
+    real_connect = sqlite3.connect
+
+    class Connection:
+        def __init__(self, path):
+            self.conn = real_connect(path)
+
+        def cursor(self):
+            return Cursor(self.conn.cursor(), self.conn)
+
+        def close(self):
+            self.conn.close()
+
+    class Cursor:
+        def __init__(self, cursor, conn):
+            self.cursor, self.conn = cursor, conn
+
+        def execute(self, sql, params=()):
+            if "JOIN users" in sql:
+                self.conn.execute("INSERT INTO users (id, name, school_class) VALUES ('9', 'Ny', '23TEP')")
+                self.conn.execute("INSERT INTO scans (card_id, timestamp) VALUES ('9', '2026-02-02 08:00:00')")
+                self.conn.commit()
+            return self.cursor.execute(sql, params)
+
+        def __getattr__(self, name):
+            return getattr(self.cursor, name)
+
+    monkeypatch.setattr(main.sqlite3, "connect", Connection)
+    report = main.build_attendance_report(None, datetime.date(2026, 2, 2), datetime.date(2026, 2, 6))
+    assert report["class_sizes"].sum() == 3
+    assert all(card_id != "9" for _, card_id, _, _ in report["absent"])
+
+
+def test_report_cache_keeps_recently_used_reports(report_db, monkeypatch):
+    monkeypatch.setattr(main, "REPORT_CACHE_SIZE", 2)
+    start, end = datetime.date(2026, 2, 2), datetime.date(2026, 2, 6)
+    first = main.build_attendance_report(None, start, end, "08:00")
+    second = main.build_attendance_report(None, start, end, "08:10")
+    assert main.build_attendance_report(None, start, end, "08:00") is first
+    main.build_attendance_report(None, start, end, "08:20")
+    assert len(main.REPORT_CACHE) == 2
+    assert main.build_attendance_report(None, start, end, "08:00") is first
+    assert main.build_attendance_report(None, start, end, "08:10") is not second
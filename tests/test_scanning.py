@@ -0,0 +1,67 @@
+import pytest
+from PyQt5.QtCore import Qt
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+import main
+
+
+@pytest.fixture
+def key_filter(app_window, monkeypatch):
+    """Installera tangentfiltret och samla kort-ID:n som skickas vidare."""
+    scanned = []
+    monkeypatch.setattr(app_window, "process_card_input", scanned.append)
+    key_filter = main.KeyEventFilter(app_window)
+    QApplication.instance().installEventFilter(key_filter)
+    key_filter.scanned = scanned
+    yield key_filter
+    QApplication.instance().removeEventFilter(key_filter)
+
+
+def type_into(widget, text, enter=True):
+    widget.setFocus()
+    QApplication.processEvents()
+    QTest.keyClicks(widget, text)
+    if enter:
+        QTest.keyClick(widget, Qt.Key_Return)
+    QApplication.processEvents()
+
+
+def test_scan_in_search_box_is_processed(app_window, key_filter):
+    app_window.show_user_list()
+    type_into(app_window.user_search_box, "1095297406")
+    assert key_filter.scanned == ["1095297406"]
+
+
+@pytest.mark.parametrize("field", ["report_start_input", "report_school_start_input", "report_grace_input",
+                                   "report_holidays_input"])
+def test_report_fields_are_not_scans(app_window, key_filter, field):
+    app_window.show_report_page()
+    type_into(getattr(app_window, field), "2026-02-02")
+    assert key_filter.scanned == []
+    assert key_filter.buffer == ""
+
+
+def test_typing_in_report_field_does_not_leak_into_next_scan(app_window, key_filter):
+    app_window.show_report_page()
+    type_into(app_window.report_end_input, "12", enter=False)
+    app_window.show_user_list()
+    type_into(app_window.user_search_box, "1095297406")
+    assert key_filter.scanned == ["1095297406"]
+
+
+def test_register_fields_are_not_scans(app_window, key_filter):
+    app_window.show_register_form()
+    type_into(app_window.name_input, "Anna")
+    assert key_filter.scanned == []
+
+
+def test_scan_with_selected_queue_cell_does_not_edit_it(app_window, key_filter):
+    app_window.show_enrollment_page()
+    table = app_window.enrollment_table
+    app_window.queue_enrollment_card("555")
+    table.item(0, 1).setText("Anna")
+    table.setCurrentCell(0, 1)
+    type_into(table, "777")
+    assert key_filter.scanned == ["777"]
+    assert table.item(0, 1).text() == "Anna"